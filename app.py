@@ -1,6 +1,10 @@
 import os
+import time
+import signal
+import asyncio
 import logging
-from openai import OpenAI
+import functools
+from openai import AsyncOpenAI, APITimeoutError
 
 # Disable ChromaDB telemetry
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
@@ -11,9 +15,13 @@ from telegram.ext import (
 )
 from config import (
     TELEGRAM_TOKEN, OPENAI_API_KEY,
-    LLM_MODEL, SYSTEM_PROMPTS, SUPPORTED_LANGUAGES
+    LLM_MODEL, SYSTEM_PROMPTS, SUPPORTED_LANGUAGES,
+    RESPONSE_DEADLINE, RETRIEVAL_BUDGET, FALLBACK_RESERVE,
+    ADMIN_USER_IDS, PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS
 )
 from database import db
+from extractive import extractive_answer
+from profiling import profiler
 import json
 
 # Configure logging
@@ -23,8 +31,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Initialize OpenAI client (async so a slow completion can be cancelled)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 # Track user sessions and language preferences
 user_sessions = {}
@@ -43,6 +51,7 @@ def get_language_keyboard():
     return InlineKeyboardMarkup(keyboard)
 
 # Command handlers
+@profiler.timed()
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a welcome message when the command /start is issued."""
     # Initialize user session
@@ -70,6 +79,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # Log the new user
     logger.info(f"New user started the bot: {user_id}")
 
+@profiler.timed()
 async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle language selection"""
     query = update.callback_query
@@ -86,6 +96,9 @@ async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         user_sessions[user_id] = {}
     user_sessions[user_id]['language'] = lang_code
     
+    # The main menu is not topic-specific, so search the whole knowledge base again
+    user_sessions[user_id].pop('topic', None)
+    
     # Confirmation messages in selected language
     confirm_messages = {
         'en': f"✅ Language set to English. How can I help you today?",
@@ -110,6 +123,7 @@ async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         reply_markup=reply_markup
     )
 
+@profiler.timed()
 async def change_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle language change request"""
     query = update.callback_query
@@ -128,13 +142,18 @@ async def change_language(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         reply_markup=get_language_keyboard()
     )
 
+@profiler.timed()
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle incoming messages and generate responses using RAG."""
     user_id = update.effective_user.id
     query = update.message.text
     
-    # Get user's language preference (default to English)
+    # Every stage below must finish before this point
+    deadline = time.monotonic() + RESPONSE_DEADLINE
+    
+    # Get user's language preference (default to English) and selected topic
     lang = user_sessions.get(user_id, {}).get('language', 'en')
+    topic = user_sessions.get(user_id, {}).get('topic')
     
     # Show typing action
     await context.bot.send_chat_action(
@@ -145,8 +164,23 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Get system prompt based on language
     system_prompt = SYSTEM_PROMPTS.get(lang, SYSTEM_PROMPTS['en'])
     
-    # Search for relevant documents
-    results = db.search(query, k=3)
+    # Search for relevant documents within the selected topic and language.
+    # The search is blocking, so run it in a worker thread under its own budget.
+    # The budget is passed down too, so the embedding request in that thread
+    # gives up when we stop waiting instead of holding an executor slot.
+    loop = asyncio.get_running_loop()
+    retrieval_budget = min(RETRIEVAL_BUDGET, deadline - time.monotonic())
+    search = functools.partial(
+        db.search, query, topic=topic, language=lang, timeout=retrieval_budget
+    )
+    try:
+        results = await asyncio.wait_for(
+            loop.run_in_executor(None, search),
+            timeout=retrieval_budget
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Retrieval exceeded its {RETRIEVAL_BUDGET}s budget for user {user_id}")
+        results = []
     
     # Format context from search results
     context = "\n\n".join([doc['text'] for doc in results])
@@ -157,27 +191,45 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         {"role": "user", "content": f"Context: {context}\n\nQuestion: {query}"}
     ]
     
+    error_messages = {
+        'en': "❌ Sorry, I encountered an error processing your request. Please try again.",
+        'sw': "❌ Samahani, kumekuwa na tatizo katika kukamilisha ombi lako. Tafadhali jaribu tena."
+    }
+    
     try:
-        # Generate response using OpenAI
-        response = client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
+        # The LLM gets whatever is left, minus time reserved for the fallback
+        llm_budget = deadline - time.monotonic() - FALLBACK_RESERVE
+        if llm_budget <= 0:
+            raise asyncio.TimeoutError
         
+        # Generate response using OpenAI, cancelled if it runs past the budget
+        response = await asyncio.wait_for(
+            client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                timeout=llm_budget
+            ),
+            timeout=llm_budget
+        )
+    except (asyncio.TimeoutError, APITimeoutError):
+        logger.warning(f"LLM missed the {RESPONSE_DEADLINE}s deadline for user {user_id}")
+    except Exception as e:
+        logger.error(f"Error generating response: {str(e)}", exc_info=e)
+        await update.message.reply_text(error_messages.get(lang, error_messages['en']))
+        return
+    else:
         # Send the response
         response_text = response.choices[0].message.content.strip()
         await update.message.reply_text(response_text)
-        
-    except Exception as e:
-        error_messages = {
-            'en': "❌ Sorry, I encountered an error processing your request. Please try again.",
-            'sw': "❌ Samahani, kumekuwa na tatizo katika kukamilisha ombi lako. Tafadhali jaribu tena."
-        }
-        await update.message.reply_text(error_messages.get(lang, error_messages['en']))
-        logger.error(f"Error generating response: {str(e)}")
+        return
+    
+    # Out of time: fall back to the best-matching sentences from the retrieved chunks
+    fallback_text = extractive_answer(query, results, lang) if results else None
+    await update.message.reply_text(fallback_text or error_messages.get(lang, error_messages['en']))
 
+@profiler.timed()
 async def handle_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle help button click"""
     query = update.callback_query
@@ -226,6 +278,7 @@ async def handle_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         reply_markup=reply_markup
     )
 
+@profiler.timed()
 async def handle_back(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle back button click"""
     query = update.callback_query
@@ -234,6 +287,9 @@ async def handle_back(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     user_id = update.effective_user.id
     lang = user_sessions.get(user_id, {}).get('language', 'en')
     
+    # The main menu is not topic-specific, so search the whole knowledge base again
+    user_sessions.get(user_id, {}).pop('topic', None)
+    
     # Main menu message
     messages = {
         'en': "How can I help you today?",
@@ -258,6 +314,7 @@ async def handle_back(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         reply_markup=reply_markup
     )
 
+@profiler.timed()
 async def handle_topic(update: Update, context: ContextTypes.DEFAULT_TYPE, topic: str) -> None:
     """Handle topic selection (agriculture or health)"""
     query = update.callback_query
@@ -266,6 +323,9 @@ async def handle_topic(update: Update, context: ContextTypes.DEFAULT_TYPE, topic
     user_id = update.effective_user.id
     lang = user_sessions.get(user_id, {}).get('language', 'en')
     
+    # Remember the topic so searches are limited to it
+    user_sessions.setdefault(user_id, {})['topic'] = topic
+    
     # Topic messages in different languages
     topic_messages = {
         'agriculture': {
@@ -311,6 +371,7 @@ async def handle_topic(update: Update, context: ContextTypes.DEFAULT_TYPE, topic
         reply_markup=reply_markup
     )
 
+@profiler.timed()
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /help is issued."""
     user_id = update.effective_user.id
@@ -351,6 +412,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # Log the help command usage
     logger.info(f"User {user_id} requested help in {lang}")
 
+@profiler.timed()
 async def language_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /language command to change the bot's language."""
     user_id = update.effective_user.id
@@ -369,15 +431,74 @@ async def language_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     # Log the language change request
     logger.info(f"User {user_id} requested language change")
 
+async def run_profile(seconds: float, application: Application = None, chat_id: int = None) -> None:
+    """Capture a profile and report the results to the log and, if given, a chat"""
+    try:
+        result = await profiler.capture(seconds)
+    except RuntimeError as e:
+        logger.warning(f"Profile not started: {e}")
+        if chat_id is not None:
+            await application.bot.send_message(chat_id, f"⚠️ {e}")
+        return
+    
+    lines = [
+        f"📊 Profile captured ({seconds:g}s, {result['samples']} stack samples)",
+        f"pstats: {result['pstats']}",
+        f"collapsed stacks: {result['collapsed']}",
+        "",
+        "Handler totals (calls, wall s, CPU s):"
+    ]
+    handlers = sorted(result['handlers'].items(), key=lambda item: item[1]['wall_s'], reverse=True)
+    for name, stats in handlers:
+        lines.append(f"• {name}: {stats['calls']}, {stats['wall_s']:.3f}, {stats['cpu_s']:.3f}")
+    if not handlers:
+        lines.append("• No handlers ran")
+    
+    report = "\n".join(lines)
+    logger.info(report)
+    if chat_id is not None:
+        await application.bot.send_message(chat_id, report)
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the admin-only /profile [seconds] command."""
+    user_id = update.effective_user.id
+    if user_id not in ADMIN_USER_IDS:
+        logger.warning(f"User {user_id} tried to run /profile without admin rights")
+        return
+    
+    try:
+        seconds = float(context.args[0]) if context.args else PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        await update.message.reply_text("Usage: /profile [seconds]")
+        return
+    seconds = min(max(seconds, 1), PROFILE_MAX_SECONDS)
+    
+    await update.message.reply_text(f"⏱️ Profiling for {seconds:g} seconds...")
+    
+    # Run in the background so updates keep being processed while we sample them
+    context.application.create_task(
+        run_profile(seconds, context.application, update.effective_chat.id)
+    )
+    logger.info(f"User {user_id} started a {seconds:g}s profile")
+
+async def post_init(application: Application) -> None:
+    """Let `kill -USR1 <pid>` start a profile capture without a restart"""
+    if hasattr(signal, 'SIGUSR1'):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1,
+            lambda: application.create_task(run_profile(PROFILE_DEFAULT_SECONDS))
+        )
+
 def main() -> None:
     """Start the bot."""
     # Create the Application and pass it your bot's token.
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = Application.builder().token(TELEGRAM_TOKEN).post_init(post_init).build()
 
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("language", language_command))
+    application.add_handler(CommandHandler("profile", profile_command))
     
     # Add callback query handlers
     application.add_handler(CallbackQueryHandler(set_language, pattern='^lang_'))
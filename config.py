@@ -10,18 +10,72 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Telegram user IDs allowed to run admin commands such as /profile (comma-separated)
+ADMIN_USER_IDS = {
+    int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',') if user_id.strip()
+}
+
 # Database settings
 DB_PATH = "chroma_db"
 COLLECTION_NAME = "askia_knowledge_base"
 
+# HNSW index settings (see Chroma's "hnsw:*" collection metadata).
+# These are fixed when the collection is created, so rebuild the database
+# after changing them. Use tune_hnsw.py to pick values for the corpus.
+HNSW_SETTINGS = {
+    "hnsw:space": "cosine",  # Using cosine similarity
+    "hnsw:M": 16,  # Graph links per node
+    "hnsw:construction_ef": 100,  # Candidate list size while building
+    "hnsw:search_ef": 10,  # Candidate list size while querying
+    "hnsw:batch_size": 100,  # Vectors buffered before indexing
+    "hnsw:sync_threshold": 1000  # Vectors indexed before persisting to disk
+}
+
 # Document processing settings
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Topic settings
+# Chunks are tagged with a topic at ingest so searches can be limited to the
+# topic the user picked. PDFs placed in documents/<topic>/ get that topic;
+# DOCUMENT_TOPICS overrides it per file name.
+TOPICS = ['agriculture', 'health']
+DEFAULT_TOPIC = 'general'  # Searched alongside whichever topic is selected
+DOCUMENT_TOPICS = {
+    'Covid-19_Knowledge.pdf': 'health',
+    'Malaria.pdf': 'health'
+}
+
+# Per-file language overrides; other files are detected from their text
+DOCUMENT_LANGUAGES = {}
+
+# Retrieval settings
+SEARCH_K = 3  # Number of chunks passed to the LLM
+SEARCH_FETCH_K = 20  # Candidates fetched from Chroma before MMR re-ranking
+MMR_LAMBDA = 0.5  # 1.0 = pure relevance, 0.0 = maximum diversity
+
+# Near-duplicate detection at ingest
+DEDUP_THRESHOLD = 0.85  # Shingle Jaccard similarity at which chunks are merged
+DEDUP_SHINGLE_SIZE = 5  # Words per shingle
+DEDUP_NUM_PERM = 64  # MinHash signature length
+DEDUP_BANDS = 16  # LSH bands (DEDUP_NUM_PERM / DEDUP_BANDS rows each)
+
 # Model settings
 EMBEDDING_MODEL = "text-embedding-ada-002"  # OpenAI's embedding model
 LLM_MODEL = "gpt-4"  # or "gpt-3.5-turbo" for faster, less expensive responses
 
+# Latency budget (seconds) for answering one message
+RESPONSE_DEADLINE = 15.0  # End-to-end bound from receiving a message to replying
+RETRIEVAL_BUDGET = 4.0  # Embedding the query and searching the database
+FALLBACK_RESERVE = 1.0  # Kept back for building and sending the extractive answer
+FALLBACK_MAX_SENTENCES = 3  # Sentences quoted when the LLM misses its deadline
+
+# Profiling settings (captures are started with /profile or SIGUSR1)
+PROFILE_DIR = "profiles"
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+PROFILE_SAMPLE_INTERVAL = 0.01  # Seconds between stack samples
+
 # Language settings
 SUPPORTED_LANGUAGES = {
     'en': 'English',
@@ -58,3 +112,14 @@ Swali la Mtumiaji: "{question}"
 
 Jibu kwa lugha ileile ya swali, isipokuwa umepewa maagizo tofauti:"""
 }
+
+# Extractive answers sent when the LLM cannot respond within the deadline
+FALLBACK_TEMPLATES = {
+    'en': """⏱️ I could not prepare a full answer in time. Here is what I found in {source}:
+
+{excerpt}""",
+
+    'sw': """⏱️ Sikuweza kuandaa jibu kamili kwa wakati. Hiki ndicho nilichopata kwenye {source}:
+
+{excerpt}"""
+}
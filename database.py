@@ -2,8 +2,49 @@ import chromadb
 from chromadb.config import Settings
 from typing import List, Dict, Any
 import os
+import json
+import numpy as np
 import openai
-from config import DB_PATH, COLLECTION_NAME, EMBEDDING_MODEL, OPENAI_API_KEY
+from deduplication import deduplicate_documents
+from profiling import profiler
+from config import (
+    DB_PATH, COLLECTION_NAME, EMBEDDING_MODEL, OPENAI_API_KEY,
+    SEARCH_K, SEARCH_FETCH_K, MMR_LAMBDA, DEFAULT_TOPIC, HNSW_SETTINGS
+)
+
+
+def maximal_marginal_relevance(query_embedding, embeddings, k: int = SEARCH_K,
+                               lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """Pick k candidate indices balancing relevance to the query against redundancy.
+
+    All pairwise cosine similarities are computed up front as one matrix, so each
+    selection step is just a row lookup over the already-chosen candidates.
+    """
+    candidates = np.asarray(embeddings, dtype=np.float32)
+    if candidates.size == 0 or k <= 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    query_sim = candidates @ query
+    pairwise_sim = candidates @ candidates.T
+
+    k = min(k, len(candidates))
+    selected = [int(np.argmax(query_sim))]
+    # Highest similarity of each candidate to anything already selected
+    redundancy = pairwise_sim[selected[0]].copy()
+
+    while len(selected) < k:
+        scores = lambda_mult * query_sim - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(redundancy, pairwise_sim[best], out=redundancy)
+
+    return selected
+
 
 class VectorDB:
     def __init__(self):
@@ -16,19 +57,34 @@ class VectorDB:
         # Create or get collection
         self.collection = self.client.get_or_create_collection(
             name=COLLECTION_NAME,
-            metadata={"hnsw:space": "cosine"}  # Using cosine similarity
+            metadata=HNSW_SETTINGS
         )
         
         # Initialize OpenAI client
-        openai.api_key = OPENAI_API_KEY
+        self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
         
         print(f"Initialized database at: {os.path.abspath(DB_PATH)}")
         print(f"Collection '{COLLECTION_NAME}' has {self.collection.count()} documents")
     
-    def get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for a given text using OpenAI's embedding model"""
+    def reset_collection(self) -> None:
+        """Delete the collection and recreate it empty with the current HNSW settings"""
+        self.client.delete_collection(COLLECTION_NAME)
+        self.collection = self.client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            metadata=HNSW_SETTINGS
+        )
+    
+    def get_embedding(self, text: str, timeout: float = None) -> List[float]:
+        """Generate embedding for a given text using OpenAI's embedding model.
+        
+        With a timeout the request is made once, without retries, and gives up
+        when the time runs out so callers on a deadline don't block a thread.
+        """
+        client = self.openai_client
+        if timeout is not None:
+            client = client.with_options(timeout=max(timeout, 0.1), max_retries=0)
         try:
-            response = openai.embeddings.create(
+            response = client.embeddings.create(
                 input=text,
                 model=EMBEDDING_MODEL
             )
@@ -37,11 +93,17 @@ class VectorDB:
             print(f"Error generating embedding: {e}")
             return None
     
+    @profiler.timed("ingest.add_documents")
     def add_documents(self, documents: List[Dict[str, Any]]) -> None:
         """Add documents to the vector database"""
         if not documents:
             print("No documents to add")
             return
+        
+        # Collapse near-duplicate chunks so each is embedded and stored once
+        documents, stats = deduplicate_documents(documents)
+        print(f"Removed {stats['removed']} near-duplicate chunks "
+              f"({stats['removed_chars']} characters), {stats['unique']} of {stats['total']} remain")
             
         print(f"Adding {len(documents)} documents to the database...")
         
@@ -65,7 +127,13 @@ class VectorDB:
                     doc_id = f"doc_{i+j}"
                     ids.append(doc_id)
                     embeddings.append(embedding)
-                    metadatas.append({"source": doc.get('source', 'unknown')})
+                    metadatas.append({
+                        "source": doc.get('source', 'unknown'),
+                        # Chroma metadata values must be scalars, so store the list as JSON
+                        "sources": json.dumps(doc.get('sources', [doc.get('source', 'unknown')])),
+                        "topic": doc.get('topic', DEFAULT_TOPIC),
+                        "language": doc.get('language', 'en')
+                    })
                     texts.append(doc['text'])
                     
                 except Exception as e:
@@ -89,25 +157,66 @@ class VectorDB:
         final_count = self.collection.count()
         print(f"Database now contains {final_count} documents")
     
-    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
-        """Search for similar documents to the query"""
+    @staticmethod
+    def build_filters(topic: str = None, language: str = None) -> List[Dict[str, Any]]:
+        """Build metadata filters from the narrowest to the widest search space"""
+        conditions = []
+        if topic:
+            conditions.append({"topic": {"$in": [topic, DEFAULT_TOPIC]}})
+        if language:
+            conditions.append({"language": language})
+        
+        filters = []
+        if len(conditions) == 2:
+            filters.append({"$and": conditions})
+        if conditions:
+            # Fall back to the topic alone if there are no chunks in the user's language
+            filters.append(conditions[0])
+        filters.append(None)  # Whole collection as a last resort
+        return filters
+    
+    @profiler.timed("db.search")
+    def search(self, query: str, k: int = SEARCH_K, fetch_k: int = SEARCH_FETCH_K,
+               lambda_mult: float = MMR_LAMBDA, topic: str = None,
+               language: str = None, timeout: float = None) -> List[Dict[str, Any]]:
+        """Search for similar documents to the query, re-ranked with MMR for diversity.
+        
+        When a topic or language is given only matching chunks are searched, widening
+        the filter step by step if that part of the collection is empty. The timeout
+        bounds the query embedding request, the only remote call in a search.
+        """
         # Get query embedding
-        query_embedding = self.get_embedding(query)
+        query_embedding = self.get_embedding(query, timeout=timeout)
         if query_embedding is None:
             return []
         
-        # Query the collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k
+        for where in self.build_filters(topic, language):
+            # Over-fetch candidates so MMR has near-duplicates to choose between
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=max(k, fetch_k),
+                where=where,
+                include=["documents", "metadatas", "distances", "embeddings"]
+            )
+            if results['ids'][0]:
+                break
+        else:
+            return []
+        
+        # Re-rank candidates
+        selected = maximal_marginal_relevance(
+            query_embedding, results['embeddings'][0], k=k, lambda_mult=lambda_mult
         )
         
         # Format results
         formatted_results = []
-        for i in range(len(results['ids'][0])):
+        for i in selected:
+            metadata = results['metadatas'][0][i]
+            source = metadata.get('source', 'unknown')
             formatted_results.append({
                 'text': results['documents'][0][i],
-                'source': results['metadatas'][0][i].get('source', 'unknown'),
+                'source': source,
+                'sources': json.loads(metadata['sources']) if 'sources' in metadata else [source],
                 'score': results['distances'][0][i] if 'distances' in results else None
             })
         
@@ -0,0 +1,102 @@
+import zlib
+import numpy as np
+from typing import List, Dict, Any, Tuple
+from config import (
+    DEDUP_THRESHOLD, DEDUP_SHINGLE_SIZE, DEDUP_NUM_PERM, DEDUP_BANDS, DEFAULT_TOPIC
+)
+
+# Prime modulus for the MinHash permutations (2^31 - 1)
+MERSENNE_PRIME = (1 << 31) - 1
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_SIZE) -> np.ndarray:
+    """Hash the overlapping word n-grams of a text to 32-bit integers"""
+    words = text.lower().split()
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    grams = {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+    return np.unique(np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64))
+
+def minhash_signatures(shingle_sets: List[np.ndarray], num_perm: int = DEDUP_NUM_PERM,
+                       seed: int = 1) -> np.ndarray:
+    """Compute a MinHash signature row for every shingle set"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(shingle_sets), num_perm), MERSENNE_PRIME, dtype=np.uint64)
+    for row, hashes in enumerate(shingle_sets):
+        if hashes.size:
+            # All permutations of all shingles at once: (shingles x num_perm)
+            signatures[row] = ((np.outer(hashes, a) + b) % MERSENNE_PRIME).min(axis=0)
+    return signatures
+
+def jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    """Exact Jaccard similarity of two shingle sets"""
+    if not left.size or not right.size:
+        return 0.0
+    shared = np.intersect1d(left, right, assume_unique=True).size
+    return shared / (left.size + right.size - shared)
+
+def deduplicate_documents(documents: List[Dict[str, Any]],
+                          threshold: float = DEDUP_THRESHOLD) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Collapse near-duplicate chunks into one canonical chunk per group.
+
+    Candidate pairs come from MinHash LSH banding and are confirmed with the exact
+    Jaccard similarity of their shingles. The first chunk of each group is kept,
+    with the sources of every copy listed in its 'sources' field.
+    """
+    shingle_sets = [shingles(doc['text']) for doc in documents]
+    signatures = minhash_signatures(shingle_sets)
+    rows_per_band = signatures.shape[1] // DEDUP_BANDS
+
+    # Union-find over confirmed duplicate pairs
+    parent = list(range(len(documents)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for band in range(DEDUP_BANDS):
+        buckets = {}
+        band_rows = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for i, key in enumerate(map(bytes, band_rows)):
+            if shingle_sets[i].size:
+                buckets.setdefault(key, []).append(i)
+
+        for members in buckets.values():
+            for position, j in enumerate(members):
+                for i in members[:position]:
+                    if (i, j) in checked or find(i) == find(j):
+                        continue
+                    checked.add((i, j))
+                    if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+                        # Keep the earliest chunk as the canonical one
+                        root_i, root_j = find(i), find(j)
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = {}
+    for i in range(len(documents)):
+        groups.setdefault(find(i), []).append(i)
+
+    unique_documents = []
+    for root in sorted(groups):
+        members = groups[root]
+        canonical = dict(documents[root])
+        sources = list(dict.fromkeys(documents[i].get('source', 'unknown') for i in members))
+        canonical['sources'] = sources
+        # A chunk shared across topics should be found from any of them
+        if len({documents[i].get('topic', DEFAULT_TOPIC) for i in members}) > 1:
+            canonical['topic'] = DEFAULT_TOPIC
+        unique_documents.append(canonical)
+
+    stats = {
+        'total': len(documents),
+        'unique': len(unique_documents),
+        'removed': len(documents) - len(unique_documents),
+        'removed_chars': sum(len(doc['text']) for doc in documents)
+                         - sum(len(doc['text']) for doc in unique_documents)
+    }
+    return unique_documents, stats
@@ -2,6 +2,24 @@ import os
 import PyPDF2
 from typing import List, Dict, Any
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from profiling import profiler
+from config import TOPICS, DEFAULT_TOPIC, DOCUMENT_TOPICS, DOCUMENT_LANGUAGES
+
+# Frequent function words used to tell English and Kiswahili text apart
+LANGUAGE_MARKERS = {
+    'en': {'the', 'and', 'of', 'to', 'is', 'in', 'that', 'for', 'are', 'with'},
+    'sw': {'na', 'ya', 'wa', 'kwa', 'ni', 'za', 'katika', 'la', 'cha', 'kuwa'}
+}
+
+def detect_language(text: str, default: str = 'en') -> str:
+    """Guess the language of a text by counting common function words"""
+    words = text.lower().split()
+    counts = {
+        lang: sum(1 for word in words if word in markers)
+        for lang, markers in LANGUAGE_MARKERS.items()
+    }
+    best = max(counts, key=counts.get)
+    return best if counts[best] > 0 else default
 
 class DocumentLoader:
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
@@ -12,8 +30,9 @@ class DocumentLoader:
             separators=["\n\n", "\n", " ", ""]
         )
     
-    def load_pdf(self, file_path: str) -> List[Dict[str, Any]]:
-        """Load and split a PDF file into chunks"""
+    @profiler.timed("ingest.load_pdf")
+    def load_pdf(self, file_path: str, topic: str = None) -> List[Dict[str, Any]]:
+        """Load and split a PDF file into chunks tagged with topic and language"""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
             
@@ -27,27 +46,37 @@ class DocumentLoader:
         # Split text into chunks
         chunks = self.text_splitter.split_text(text)
         
+        # Tag every chunk with the topic and language of its document
+        filename = os.path.basename(file_path)
+        topic = DOCUMENT_TOPICS.get(filename, topic or DEFAULT_TOPIC)
+        language = DOCUMENT_LANGUAGES.get(filename) or detect_language(text)
+        
         # Prepare documents with metadata
         documents = []
         for chunk in chunks:
             documents.append({
                 'text': chunk,
-                'source': os.path.basename(file_path)
+                'source': filename,
+                'topic': topic,
+                'language': language
             })
             
         return documents
     
-    def load_directory(self, dir_path: str) -> List[Dict[str, Any]]:
-        """Load all PDF files from a directory"""
+    def load_directory(self, dir_path: str, topic: str = None) -> List[Dict[str, Any]]:
+        """Load all PDF files from a directory, including topic subdirectories"""
         if not os.path.isdir(dir_path):
             raise NotADirectoryError(f"Directory not found: {dir_path}")
             
         all_documents = []
         for filename in os.listdir(dir_path):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(dir_path, filename)
+            file_path = os.path.join(dir_path, filename)
+            if os.path.isdir(file_path) and filename in TOPICS:
+                # documents/<topic>/*.pdf are tagged with that topic
+                all_documents.extend(self.load_directory(file_path, topic=filename))
+            elif filename.lower().endswith('.pdf'):
                 try:
-                    documents = self.load_pdf(file_path)
+                    documents = self.load_pdf(file_path, topic=topic)
                     all_documents.extend(documents)
                     print(f"Loaded {len(documents)} chunks from {filename}")
                 except Exception as e:
@@ -0,0 +1,85 @@
+import re
+import numpy as np
+from typing import List, Dict, Any, Optional
+from config import FALLBACK_TEMPLATES, FALLBACK_MAX_SENTENCES
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+TOKEN = re.compile(r'\w+')
+
+def split_sentences(text: str) -> List[str]:
+    """Split a chunk into sentences, dropping fragments too short to be useful"""
+    sentences = [sentence.strip() for sentence in SENTENCE_SPLIT.split(text.lstrip())]
+    # A chunk that starts in lowercase was cut mid-sentence by the text splitter
+    if sentences and sentences[0][:1].islower():
+        sentences = sentences[1:]
+    return [sentence for sentence in sentences if len(TOKEN.findall(sentence)) >= 4]
+
+def rank_sentences(query: str, sentences: List[str]) -> np.ndarray:
+    """Score sentences by the TF-IDF weight of the query terms they contain.
+
+    The score is the dot product of the sentence and query TF-IDF vectors, divided
+    by the query norm and the square root of the sentence's token count. Uses word
+    counts rather than embeddings so no API call is needed; the whole sentence set
+    is scored with one matrix-vector product.
+    """
+    tokenised = [TOKEN.findall(sentence.lower()) for sentence in sentences]
+    query_tokens = TOKEN.findall(query.lower())
+    vocabulary = {word: i for i, word in enumerate(dict.fromkeys(query_tokens))}
+    if not vocabulary:
+        return np.zeros(len(sentences))
+
+    # Only query terms can contribute to the dot product
+    counts = np.zeros((len(sentences), len(vocabulary)))
+    for row, tokens in enumerate(tokenised):
+        for token in tokens:
+            column = vocabulary.get(token)
+            if column is not None:
+                counts[row, column] += 1
+    lengths = np.array([max(len(tokens), 1) for tokens in tokenised], dtype=float)
+
+    idf = np.log((1 + len(sentences)) / (1 + (counts > 0).sum(axis=0))) + 1
+    query_vector = np.zeros(len(vocabulary))
+    for token in query_tokens:
+        query_vector[vocabulary[token]] += 1
+    query_vector *= idf
+
+    # Normalise by sentence length so long sentences don't win by size alone
+    weighted = counts * idf
+    return (weighted @ query_vector) / (np.sqrt(lengths) * np.linalg.norm(query_vector))
+
+def extractive_answer(query: str, results: List[Dict[str, Any]], lang: str = 'en',
+                      max_sentences: int = FALLBACK_MAX_SENTENCES) -> Optional[str]:
+    """Build a quick answer from the best-matching sentences of retrieved chunks.
+
+    Falls back to the opening sentences of the top-ranked chunk when no sentence
+    shares a word with the query, e.g. a Kiswahili question over English PDFs.
+    """
+    # Overlapping chunks repeat sentences, so collect each sentence once with
+    # the sources of every chunk it appears in
+    sentence_sources = {}
+    leading_count = 0
+    for doc in results:
+        doc_sources = doc.get('sources') or [doc.get('source', 'unknown')]
+        for sentence in split_sentences(doc['text']):
+            sentence_sources.setdefault(sentence, {}).update(dict.fromkeys(doc_sources))
+        # Sentences of the top-ranked chunk come first, in their original order
+        leading_count = leading_count or len(sentence_sources)
+    if not sentence_sources:
+        return None
+    sentences = list(sentence_sources)
+
+    scores = rank_sentences(query, sentences)
+    best = [i for i in np.argsort(-scores, kind='stable')[:max_sentences] if scores[i] > 0]
+    if not best:
+        # Results are already ordered by embedding similarity, so quote the opening
+        # of the top-ranked chunk that has usable sentences
+        best = list(range(min(max_sentences, leading_count)))
+
+    # Keep the document order so the excerpt reads naturally
+    best.sort()
+    excerpt = "\n".join(f"• {sentences[i]}" for i in best)
+    source = ", ".join(dict.fromkeys(
+        name for i in best for name in sentence_sources[sentences[i]]
+    ))
+    template = FALLBACK_TEMPLATES.get(lang, FALLBACK_TEMPLATES['en'])
+    return template.format(excerpt=excerpt, source=source)
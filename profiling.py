@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import cProfile
+import threading
+import functools
+from collections import Counter
+from typing import Dict, Any, Callable
+from config import PROFILE_DIR, PROFILE_SAMPLE_INTERVAL
+
+class Profiler:
+    """On-demand profiling for the running bot.
+
+    Nothing is recorded until capture() is called: the timing decorator only checks
+    a flag while idle. During a capture the event loop thread is traced with cProfile,
+    a background thread samples the stacks of every thread, and decorated handlers
+    accumulate their wall and CPU time.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._handler_stats = {}
+
+    def timed(self, name: str = None) -> Callable:
+        """Decorator recording wall and CPU time of a handler while a capture runs.
+
+        CPU time is that of the calling thread, so for coroutines it also includes
+        other work the event loop did while the handler was waiting.
+        """
+        def decorator(func: Callable) -> Callable:
+            label = name or func.__name__
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.active:
+                        return await func(*args, **kwargs)
+                    wall, cpu = time.perf_counter(), time.thread_time()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self._record(label, time.perf_counter() - wall, time.thread_time() - cpu)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.active:
+                    return func(*args, **kwargs)
+                wall, cpu = time.perf_counter(), time.thread_time()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._record(label, time.perf_counter() - wall, time.thread_time() - cpu)
+            return wrapper
+
+        return decorator
+
+    def _record(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            stats = self._handler_stats.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            stats['calls'] += 1
+            stats['wall_s'] += wall
+            stats['cpu_s'] += cpu
+
+    def _sample_stacks(self, stop: threading.Event, samples: Counter) -> None:
+        """Collect collapsed stacks of all other threads until stopped"""
+        own_id = threading.get_ident()
+        while not stop.wait(PROFILE_SAMPLE_INTERVAL):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                samples[";".join(reversed(stack))] += 1
+
+    async def capture(self, seconds: float) -> Dict[str, Any]:
+        """Profile the running process for a number of seconds and dump the results.
+
+        Writes a .pstats file (cProfile of the event loop thread), a .collapsed file
+        (sampled stacks of all threads, for flamegraph tools) and a handler timing
+        .json file to PROFILE_DIR. Must be awaited on the bot's event loop.
+        """
+        if self.active:
+            raise RuntimeError("A profile capture is already running")
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, time.strftime("profile-%Y%m%d-%H%M%S"))
+
+        samples = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample_stacks, args=(stop, samples), daemon=True)
+        profile = cProfile.Profile()
+
+        with self._lock:
+            self._handler_stats = {}
+        self.active = True
+        sampler.start()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+            self.active = False
+            stop.set()
+            sampler.join()
+
+        profile.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", 'w', encoding='utf-8') as file:
+            for stack, count in samples.most_common():
+                file.write(f"{stack} {count}\n")
+        with self._lock:
+            handler_stats = dict(self._handler_stats)
+        with open(f"{base}-handlers.json", 'w', encoding='utf-8') as file:
+            json.dump(handler_stats, file, indent=2)
+
+        return {
+            'pstats': f"{base}.pstats",
+            'collapsed': f"{base}.collapsed",
+            'handlers': handler_stats,
+            'samples': sum(samples.values())
+        }
+
+# Initialize a global profiler shared by the bot and ingestion code
+profiler = Profiler()
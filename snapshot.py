@@ -0,0 +1,148 @@
+import os
+import json
+import argparse
+import numpy as np
+from typing import Dict, Any
+from config import EMBEDDING_MODEL, COLLECTION_NAME
+
+# Bump when the on-disk layout changes
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+COLUMNS_FILE = "columns.json"
+
+# Rows read from / written to Chroma per call
+PAGE_SIZE = 1000
+
+def export_snapshot(db, path: str) -> Dict[str, Any]:
+    """Export the collection to a snapshot directory.
+
+    The snapshot holds the embeddings as a float32 .npy matrix, the ids, texts and
+    metadata as one JSON column each, and a manifest with the format version and
+    embedding model so replicas can be loaded without calling OpenAI.
+    """
+    total = db.collection.count()
+    if total == 0:
+        raise ValueError("Collection is empty, nothing to export")
+
+    os.makedirs(path, exist_ok=True)
+
+    ids, texts, metadatas = [], [], []
+    embeddings = None
+    for offset in range(0, total, PAGE_SIZE):
+        page = db.collection.get(
+            limit=PAGE_SIZE,
+            offset=offset,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        page_embeddings = np.asarray(page['embeddings'], dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(path, EMBEDDINGS_FILE), mode='w+',
+                dtype=np.float32, shape=(total, page_embeddings.shape[1])
+            )
+        embeddings[len(ids):len(ids) + len(page['ids'])] = page_embeddings
+        ids.extend(page['ids'])
+        texts.extend(page['documents'])
+        metadatas.extend(page['metadatas'])
+    embeddings.flush()
+
+    # Store metadata column-wise: one list per key, aligned with ids
+    keys = sorted({key for metadata in metadatas for key in metadata})
+    columns = {
+        'ids': ids,
+        'documents': texts,
+        'metadata': {key: [metadata.get(key) for metadata in metadatas] for key in keys}
+    }
+    with open(os.path.join(path, COLUMNS_FILE), 'w', encoding='utf-8') as file:
+        json.dump(columns, file, ensure_ascii=False)
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'collection': COLLECTION_NAME,
+        'embedding_model': EMBEDDING_MODEL,
+        'count': len(ids),
+        'dimensions': int(embeddings.shape[1])
+    }
+    with open(os.path.join(path, MANIFEST_FILE), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+
+    print(f"Exported {len(ids)} documents to {os.path.abspath(path)}")
+    return manifest
+
+def import_snapshot(db, path: str, replace: bool = False) -> Dict[str, Any]:
+    """Bulk-load a snapshot directory into the collection without re-embedding.
+
+    Refuses to load into a non-empty collection, since leftover rows would be mixed
+    with the snapshot's; with replace=True the collection is recreated first.
+    """
+    with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as file:
+        manifest = json.load(file)
+
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot version {manifest.get('version')} "
+            f"(expected {SNAPSHOT_VERSION})"
+        )
+    if manifest.get('embedding_model') != EMBEDDING_MODEL:
+        raise ValueError(
+            f"Snapshot was embedded with {manifest.get('embedding_model')}, "
+            f"but EMBEDDING_MODEL is {EMBEDDING_MODEL}"
+        )
+
+    # Memory-map the embeddings so only the batch being loaded is read into memory
+    embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+    with open(os.path.join(path, COLUMNS_FILE), encoding='utf-8') as file:
+        columns = json.load(file)
+
+    ids = columns['ids']
+    if len(ids) != manifest['count'] or embeddings.shape[0] != manifest['count']:
+        raise ValueError("Snapshot is corrupt: row counts do not match the manifest")
+
+    existing = db.collection.count()
+    if existing:
+        if not replace:
+            raise ValueError(
+                f"Collection already contains {existing} documents; "
+                f"use --replace to delete them before importing"
+            )
+        print(f"Deleting {existing} existing documents before import")
+        db.reset_collection()
+
+    metadata_columns = columns['metadata']
+    for start in range(0, len(ids), PAGE_SIZE):
+        end = start + PAGE_SIZE
+        metadatas = [
+            {key: values[i] for key, values in metadata_columns.items() if values[i] is not None}
+            for i in range(start, min(end, len(ids)))
+        ]
+        db.collection.upsert(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end].tolist(),
+            metadatas=metadatas,
+            documents=columns['documents'][start:end]
+        )
+
+    print(f"Imported {len(ids)} documents from {os.path.abspath(path)}")
+    print(f"Database now contains {db.collection.count()} documents")
+    return manifest
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import a knowledge base snapshot")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('export', help="Write the collection to a snapshot").add_argument('path')
+    import_parser = subparsers.add_parser('import', help="Load a snapshot into the collection")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--replace', action='store_true',
+                               help="Delete the existing collection before importing")
+    args = parser.parse_args()
+
+    from database import db
+    if args.command == 'export':
+        export_snapshot(db, args.path)
+    else:
+        import_snapshot(db, args.path, replace=args.replace)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import time
+import argparse
+import itertools
+import numpy as np
+from typing import List, Dict, Any
+
+# Disable ChromaDB telemetry
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+import chromadb
+from config import HNSW_SETTINGS
+
+def load_corpus_embeddings(snapshot_path: str = None) -> np.ndarray:
+    """Load corpus embeddings from a snapshot or the live collection (no API calls)"""
+    if snapshot_path:
+        from snapshot import EMBEDDINGS_FILE
+        return np.load(os.path.join(snapshot_path, EMBEDDINGS_FILE))
+
+    from database import db
+    results = db.collection.get(include=["embeddings"])
+    return np.asarray(results['embeddings'], dtype=np.float32)
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine top-k, used as ground truth for recall"""
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    similarities = queries @ corpus.T
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    return top
+
+def evaluate(corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+             settings: Dict[str, Any], k: int) -> Dict[str, Any]:
+    """Build an in-memory index with the given settings and measure it"""
+    client = chromadb.EphemeralClient()
+    name = "tune_" + "_".join(str(value) for value in settings.values())
+    metadata = dict(HNSW_SETTINGS, **settings)
+    collection = client.get_or_create_collection(name=name, metadata=metadata)
+
+    ids = [str(i) for i in range(len(corpus))]
+    start = time.perf_counter()
+    batch_size = 1000
+    for i in range(0, len(corpus), batch_size):
+        collection.add(ids=ids[i:i + batch_size], embeddings=corpus[i:i + batch_size].tolist())
+    build_time = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        found = {int(doc_id) for doc_id in results['ids'][0]}
+        hits += len(found.intersection(expected.tolist()))
+
+    client.delete_collection(name)
+    return {
+        **settings,
+        'recall': hits / (len(queries) * k),
+        'latency_ms': float(np.median(latencies)) * 1000,
+        'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+        'build_s': build_time
+    }
+
+def pareto_front(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep settings that no other setting beats on both recall and latency"""
+    front = []
+    best_recall = -1.0
+    for row in sorted(rows, key=lambda r: (r['latency_ms'], -r['recall'])):
+        if row['recall'] > best_recall:
+            front.append(row)
+            best_recall = row['recall']
+    return front
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'M':>4} {'constr_ef':>10} {'search_ef':>10} {'recall':>8} "
+          f"{'median ms':>10} {'p95 ms':>8} {'build s':>8}")
+    for row in rows:
+        print(f"{row['hnsw:M']:>4} {row['hnsw:construction_ef']:>10} {row['hnsw:search_ef']:>10} "
+              f"{row['recall']:>8.3f} {row['latency_ms']:>10.2f} {row['p95_ms']:>8.2f} "
+              f"{row['build_s']:>8.2f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure recall@k, query latency and build time for a grid of HNSW settings"
+    )
+    parser.add_argument('--snapshot', help="Read embeddings from a snapshot instead of the database")
+    parser.add_argument('--k', type=int, default=10, help="Neighbours per query for recall@k")
+    parser.add_argument('--queries', type=int, default=100, help="Corpus vectors held out as queries")
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--construction-ef', type=int, nargs='+', default=[64, 100, 200])
+    parser.add_argument('--search-ef', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    embeddings = load_corpus_embeddings(args.snapshot)
+    if len(embeddings) <= args.queries + args.k:
+        raise SystemExit(f"Need more than {args.queries + args.k} embeddings, found {len(embeddings)}")
+
+    # Hold out a random sample as queries so they are not trivially their own neighbour
+    order = np.random.default_rng(args.seed).permutation(len(embeddings))
+    queries = embeddings[order[:args.queries]]
+    corpus = embeddings[order[args.queries:]]
+    truth = exact_neighbours(corpus, queries, args.k)
+    print(f"Corpus: {len(corpus)} vectors, {len(queries)} queries, k={args.k}\n")
+
+    rows = []
+    for m, construction_ef, search_ef in itertools.product(
+            args.m, args.construction_ef, args.search_ef):
+        settings = {
+            'hnsw:M': m,
+            'hnsw:construction_ef': construction_ef,
+            'hnsw:search_ef': search_ef
+        }
+        rows.append(evaluate(corpus, queries, truth, settings, args.k))
+
+    print("=== All settings ===")
+    print_table(rows)
+    print("\n=== Pareto front (recall vs median latency) ===")
+    print_table(pareto_front(rows))
+
+if __name__ == "__main__":
+    main()